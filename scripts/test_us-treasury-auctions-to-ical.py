@@ -3,22 +3,26 @@
 # dependencies = [
 #     "click",
 #     "icalendar",
+#     "orjson",
 #     "pytest",
 #     "pytest-cov",
-#     "requests",
+#     "urllib3",
 # ]
 # ///
 
+import hashlib
 import importlib.util
+import json
 import subprocess
+import time
 from datetime import date, datetime, timedelta
 from pathlib import Path
 from types import ModuleType
 from unittest.mock import Mock
 
 import pytest
-import requests
-from icalendar import Calendar
+import urllib3
+from icalendar import Calendar, Event
 
 
 SCRIPT_PATH = Path(__file__).with_name("us-treasury-auctions-to-ical.py")
@@ -35,6 +39,34 @@ def treasury_module() -> ModuleType:
     return module
 
 
+@pytest.fixture
+def output_dir(
+    treasury_module: ModuleType,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> Path:
+    output_dir = tmp_path / "output"
+    monkeypatch.setattr(treasury_module, "OUTPUT_DIR", output_dir)
+    monkeypatch.setattr(
+        treasury_module, "OUTPUT_FILE", output_dir / "treasury-auctions.ics"
+    )
+    monkeypatch.setattr(treasury_module, "CACHE_META_FILE", output_dir / ".cache.json")
+    monkeypatch.setattr(treasury_module, "CACHE_BODY_FILE", output_dir / ".cache.bin")
+    monkeypatch.setattr(treasury_module, "HASH_FILE", output_dir / ".ics.hash")
+    return output_dir
+
+
+def write_cache(output_dir: Path, body: bytes, fetched_at: float) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / ".cache.bin").write_bytes(body)
+    (output_dir / ".cache.json").write_text(json.dumps({
+        "etag": '"abc123"',
+        "last_modified": "Thu, 11 Jun 2026 12:00:00 GMT",
+        "body_sha": hashlib.sha256(body).hexdigest(),
+        "fetched_at": fetched_at,
+    }))
+
+
 @pytest.fixture
 def security() -> dict[str, str]:
     return {
@@ -55,13 +87,12 @@ def test_create_auction_event_has_required_fields(
     treasury_module: ModuleType,
     security: dict[str, str],
 ) -> None:
-    event = treasury_module.create_auction_event(security)
+    serialized = treasury_module.create_auction_event(security).decode()
+    event = Event.from_ical(serialized)
 
     assert event["uid"] == "912797TEST-auction@treasurydirect.gov"
     assert event.decoded("dtstart") == date(2026, 6, 18)
     assert event["summary"] == "4-Week Bill Auction"
-
-    serialized = event.to_ical().decode()
     assert "DTSTAMP:" not in serialized
     assert "Competitive Closing: 11:30 AM" in event["description"]
     assert "Non-Competitive Closing: 11:00 AM" in event["description"]
@@ -73,17 +104,67 @@ def test_create_announcement_event_has_required_fields(
     treasury_module: ModuleType,
     security: dict[str, str],
 ) -> None:
-    event = treasury_module.create_announcement_event(security)
+    serialized = treasury_module.create_announcement_event(security).decode()
+    event = Event.from_ical(serialized)
 
     assert event["uid"] == "912797TEST-announcement@treasurydirect.gov"
     assert event.decoded("dtstart") == date(2026, 6, 11)
     assert event["summary"] == "4-Week Bill Auction Announced"
-    serialized = event.to_ical().decode()
     assert "DTSTAMP:" not in serialized
     assert "Auction Date: 2026-06-18T00:00:00" in event["description"]
     assert "Maturity Date: 2026-07-21" in event["description"]
 
 
+def test_create_auction_event_skips_missing_optional_fields(
+    treasury_module: ModuleType,
+    security: dict[str, str],
+) -> None:
+    del security["closingTimeNoncompetitive"]
+    security["issueDate"] = ""
+
+    event = Event.from_ical(treasury_module.create_auction_event(security).decode())
+
+    assert event["description"] == "\n".join([
+        "CUSIP: 912797TEST",
+        "Security Term: 4-Week",
+        "Offering Amount: $75000000000",
+        "Competitive Closing: 11:30 AM",
+        "Maturity Date: 2026-07-21T00:00:00",
+    ])
+
+
+@pytest.mark.parametrize(
+    ("date_str", "expected"),
+    [
+        ("2026-06-18T00:00:00", "20260618"),
+        ("2026-12-01", "20261201"),
+    ],
+)
+def test_format_ical_date(
+    treasury_module: ModuleType,
+    date_str: str,
+    expected: str,
+) -> None:
+    assert treasury_module.format_ical_date(date_str) == expected
+
+
+def test_format_vevent_escapes_and_folds_text(treasury_module: ModuleType) -> None:
+    summary = "10-Year Note; reopening, " + "\u00e9" * 80
+    serialized = treasury_module.format_vevent(
+        uid="912797TEST-auction@treasurydirect.gov",
+        dtstart="20260618",
+        summary=summary,
+        description="CUSIP: 912797TEST\nOffering Amount: $1,000",
+        categories=["Treasury", "Auction", "Note, TIPS"],
+    )
+
+    assert all(len(line) <= 75 for line in serialized.split(b"\r\n"))
+    event = Event.from_ical(serialized.decode())
+    assert event["summary"] == summary
+    assert event["description"] == "CUSIP: 912797TEST\nOffering Amount: $1,000"
+    assert event["categories"].cats == ["Treasury", "Auction", "Note, TIPS"]
+
+
 @pytest.mark.parametrize(
     ("event_types", "expected_events"),
     [
@@ -93,14 +174,18 @@ def test_create_announcement_event_has_required_fields(
         ([], 0),
     ],
 )
-def test_generate_calendar_selects_requested_event_types(
+def test_save_calendar_selects_requested_event_types(
     treasury_module: ModuleType,
+    output_dir: Path,
     security: dict[str, str],
     event_types: list[str],
     expected_events: int,
 ) -> None:
-    calendar = treasury_module.generate_calendar([security], event_types)
+    treasury_module.save_calendar(
+        treasury_module.iter_vevent_bytes([security], event_types)
+    )
 
+    calendar = Calendar.from_ical((output_dir / "treasury-auctions.ics").read_bytes())
     assert calendar["version"] == "2.0"
     assert calendar["prodid"] == "-//Treasury Auction Calendar//elmotec.github.io//"
     assert len(calendar.walk("VEVENT")) == expected_events
@@ -134,32 +219,107 @@ def test_filter_securities_includes_entire_boundary_day(
     ) == [boundary_security]
 
 
+def test_deduplicate_securities_keeps_last_row_per_auction(
+    treasury_module: ModuleType,
+) -> None:
+    securities = [
+        {"cusip": "912797A", "auctionDate": "2026-06-18T00:00:00", "rev": 1},
+        {"cusip": "912797B", "auctionDate": "2026-06-18T00:00:00", "rev": 1},
+        {"cusip": "912797A", "auctionDate": "2026-06-18T00:00:00", "rev": 2},
+        {"cusip": "912797A", "auctionDate": "2026-07-16T00:00:00", "rev": 1},
+    ]
+
+    assert treasury_module.deduplicate_securities(securities) == [
+        securities[2],
+        securities[1],
+        securities[3],
+    ]
+
+
 def test_fetch_treasury_data_returns_response_json(
     treasury_module: ModuleType,
     monkeypatch: pytest.MonkeyPatch,
+    output_dir: Path,
     security: dict[str, str],
 ) -> None:
-    response = Mock()
-    response.json.return_value = [security]
-    monkeypatch.setattr(treasury_module.requests, "get", Mock(return_value=response))
+    response = Mock(status=200, headers={"ETag": '"abc123"'})
+    response.data = json.dumps([security]).encode()
+    pool = Mock()
+    pool.request.return_value = response
+    monkeypatch.setattr(treasury_module, "HTTP_POOL", pool)
 
     assert treasury_module.fetch_treasury_data() == [security]
-    treasury_module.requests.get.assert_called_once_with(
+    pool.request.assert_called_once_with("GET", treasury_module.API_URL, headers={})
+    assert (output_dir / ".cache.bin").read_bytes() == response.data
+    assert json.loads((output_dir / ".cache.json").read_text())["etag"] == '"abc123"'
+
+
+def test_fetch_treasury_data_uses_fresh_cache_without_request(
+    treasury_module: ModuleType,
+    monkeypatch: pytest.MonkeyPatch,
+    output_dir: Path,
+    security: dict[str, str],
+) -> None:
+    write_cache(output_dir, json.dumps([security]).encode(), time.time())
+    pool = Mock()
+    monkeypatch.setattr(treasury_module, "HTTP_POOL", pool)
+
+    assert treasury_module.fetch_treasury_data(max_age=300) == [security]
+    pool.request.assert_not_called()
+
+
+def test_fetch_treasury_data_reuses_cache_when_not_modified(
+    treasury_module: ModuleType,
+    monkeypatch: pytest.MonkeyPatch,
+    output_dir: Path,
+    security: dict[str, str],
+) -> None:
+    write_cache(output_dir, json.dumps([security]).encode(), time.time() - 600)
+    pool = Mock()
+    pool.request.return_value = Mock(status=304)
+    monkeypatch.setattr(treasury_module, "HTTP_POOL", pool)
+
+    assert treasury_module.fetch_treasury_data(max_age=300) == [security]
+    pool.request.assert_called_once_with(
+        "GET",
         treasury_module.API_URL,
-        timeout=treasury_module.REQUEST_TIMEOUT,
+        headers={
+            "If-None-Match": '"abc123"',
+            "If-Modified-Since": "Thu, 11 Jun 2026 12:00:00 GMT",
+        },
     )
-    response.raise_for_status.assert_called_once_with()
+    meta = json.loads((output_dir / ".cache.json").read_text())
+    assert time.time() - meta["fetched_at"] < 300
+
+
+def test_fetch_treasury_data_ignores_corrupt_cache(
+    treasury_module: ModuleType,
+    monkeypatch: pytest.MonkeyPatch,
+    output_dir: Path,
+    security: dict[str, str],
+) -> None:
+    write_cache(output_dir, b"[]", time.time())
+    (output_dir / ".cache.bin").write_bytes(b"[truncated")
+    response = Mock(status=200, headers={})
+    response.data = json.dumps([security]).encode()
+    pool = Mock()
+    pool.request.return_value = response
+    monkeypatch.setattr(treasury_module, "HTTP_POOL", pool)
+
+    assert treasury_module.fetch_treasury_data() == [security]
+    pool.request.assert_called_once_with("GET", treasury_module.API_URL, headers={})
 
 
 def test_fetch_treasury_data_exits_on_request_error(
     treasury_module: ModuleType,
     monkeypatch: pytest.MonkeyPatch,
+    output_dir: Path,
 ) -> None:
-    monkeypatch.setattr(
-        treasury_module.requests,
-        "get",
-        Mock(side_effect=requests.RequestException("network unavailable")),
+    pool = Mock()
+    pool.request.side_effect = urllib3.exceptions.MaxRetryError(
+        pool, "/", "network unavailable"
     )
+    monkeypatch.setattr(treasury_module, "HTTP_POOL", pool)
 
     with pytest.raises(SystemExit) as exc_info:
         treasury_module.fetch_treasury_data()
@@ -167,26 +327,76 @@ def test_fetch_treasury_data_exits_on_request_error(
     assert exc_info.value.code == 1
 
 
-def test_save_calendar_writes_valid_ical(
+def test_fetch_treasury_data_exits_on_http_error_status(
     treasury_module: ModuleType,
     monkeypatch: pytest.MonkeyPatch,
-    tmp_path: Path,
+    output_dir: Path,
+) -> None:
+    pool = Mock()
+    pool.request.return_value = Mock(status=503, headers={}, data=b"")
+    monkeypatch.setattr(treasury_module, "HTTP_POOL", pool)
+
+    with pytest.raises(SystemExit) as exc_info:
+        treasury_module.fetch_treasury_data()
+
+    assert exc_info.value.code == 1
+    assert not (output_dir / ".cache.bin").exists()
+
+
+def test_fetch_treasury_data_exits_on_invalid_json(
+    treasury_module: ModuleType,
+    monkeypatch: pytest.MonkeyPatch,
+    output_dir: Path,
+) -> None:
+    pool = Mock()
+    pool.request.return_value = Mock(
+        status=200, headers={}, data=b"<html>Service Unavailable</html>"
+    )
+    monkeypatch.setattr(treasury_module, "HTTP_POOL", pool)
+
+    with pytest.raises(SystemExit) as exc_info:
+        treasury_module.fetch_treasury_data()
+
+    assert exc_info.value.code == 1
+
+
+def test_save_calendar_writes_valid_ical(
+    treasury_module: ModuleType,
+    output_dir: Path,
     security: dict[str, str],
 ) -> None:
-    output_dir = tmp_path / "output"
     output_file = output_dir / "treasury-auctions.ics"
-    monkeypatch.setattr(treasury_module, "OUTPUT_DIR", output_dir)
-    monkeypatch.setattr(treasury_module, "OUTPUT_FILE", output_file)
-    calendar = treasury_module.generate_calendar([security], ["auction"])
+    events = treasury_module.iter_vevent_bytes([security], ["auction"])
 
-    treasury_module.save_calendar(calendar)
+    digest = treasury_module.save_calendar(events)
 
+    assert digest == hashlib.blake2b(output_file.read_bytes(), digest_size=16).hexdigest()
     parsed = Calendar.from_ical(output_file.read_bytes())
     events = parsed.walk("VEVENT")
     assert len(events) == 1
     assert events[0]["uid"] == "912797TEST-auction@treasurydirect.gov"
 
 
+def test_save_calendar_keeps_previous_file_on_failure(
+    treasury_module: ModuleType,
+    output_dir: Path,
+    security: dict[str, str],
+) -> None:
+    output_file = output_dir / "treasury-auctions.ics"
+    output_dir.mkdir()
+    output_file.write_bytes(b"previous calendar")
+
+    def failing_events():
+        yield from treasury_module.iter_vevent_bytes([security], ["auction"])
+        raise RuntimeError("interrupted")
+
+    with pytest.raises(RuntimeError):
+        treasury_module.save_calendar(failing_events())
+
+    assert output_file.read_bytes() == b"previous calendar"
+    assert list(output_dir.iterdir()) == [output_file]
+
+
 @pytest.mark.parametrize(
     ("diff", "expected"),
     [
@@ -204,23 +414,62 @@ def test_has_changes_to_commit(
     assert treasury_module.has_changes_to_commit(diff) is expected
 
 
+def test_commit_and_push_skips_git_when_hash_unchanged(
+    treasury_module: ModuleType,
+    monkeypatch: pytest.MonkeyPatch,
+    output_dir: Path,
+) -> None:
+    output_dir.mkdir()
+    (output_dir / ".ics.hash").write_text("0123abcd")
+    run_git_command = Mock()
+    monkeypatch.setattr(treasury_module, "run_git_command", run_git_command)
+
+    treasury_module.commit_and_push("0123abcd")
+
+    run_git_command.assert_not_called()
+
+
+def test_commit_and_push_records_hash_after_push(
+    treasury_module: ModuleType,
+    monkeypatch: pytest.MonkeyPatch,
+    output_dir: Path,
+) -> None:
+    output_dir.mkdir()
+    (output_dir / ".ics.hash").write_text("stale")
+    run_git_command = Mock(return_value=subprocess.CompletedProcess(
+        args=["git"],
+        returncode=0,
+        stdout=b"+BEGIN:VEVENT\n",
+        stderr=b"",
+    ))
+    monkeypatch.setattr(treasury_module, "run_git_command", run_git_command)
+
+    treasury_module.commit_and_push("0123abcd")
+
+    assert run_git_command.call_count == 4
+    assert (output_dir / ".ics.hash").read_text() == "0123abcd"
+
+
 def test_commit_and_push_exits_when_git_add_fails(
     treasury_module: ModuleType,
     monkeypatch: pytest.MonkeyPatch,
+    output_dir: Path,
+    caplog: pytest.LogCaptureFixture,
 ) -> None:
     git_add_failure = subprocess.CompletedProcess(
         args=["git", "add"],
         returncode=1,
-        stdout="",
-        stderr="cannot update index",
+        stdout=b"",
+        stderr=b"cannot update index",
     )
     run_git_command = Mock(return_value=git_add_failure)
     monkeypatch.setattr(treasury_module, "run_git_command", run_git_command)
 
     with pytest.raises(SystemExit) as exc_info:
-        treasury_module.commit_and_push()
+        treasury_module.commit_and_push("0123abcd")
 
     assert exc_info.value.code == 1
+    assert "Error staging changes: cannot update index" in caplog.text
     run_git_command.assert_called_once_with([
         "git",
         "add",
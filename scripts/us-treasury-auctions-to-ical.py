@@ -2,71 +2,228 @@
 # requires-python = ">=3.11"
 # dependencies = [
 #     "click",
-#     "icalendar",
-#     "requests",
+#     "orjson",
+#     "urllib3",
 # ]
 # ///
 
+import hashlib
+import json
 import logging
+import os
 import subprocess
 import sys
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import chain
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 from typing import Any
 
 import click
-import requests
-from icalendar import Calendar, Event
+import urllib3
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 
 API_URL = "https://www.treasurydirect.gov/TA_WS/securities/announced?format=json"
 OUTPUT_DIR = Path(__file__).parent / "output"
 OUTPUT_FILE = OUTPUT_DIR / "treasury-auctions.ics"
+CACHE_META_FILE = OUTPUT_DIR / ".cache.json"
+CACHE_BODY_FILE = OUTPUT_DIR / ".cache.bin"
+HASH_FILE = OUTPUT_DIR / ".ics.hash"
 REQUEST_TIMEOUT = 30
+WRITE_BUFFER_SIZE = 1 << 20
+DEFAULT_MAX_AGE = 300
+
+HTTP_POOL = urllib3.PoolManager(num_pools=2, timeout=REQUEST_TIMEOUT)
+
+# Property order matches what icalendar emitted, so the committed file does
+# not churn.
+VCALENDAR_HEADER = (
+    b"BEGIN:VCALENDAR\r\n"
+    b"VERSION:2.0\r\n"
+    b"PRODID:-//Treasury Auction Calendar//elmotec.github.io//\r\n"
+)
+VCALENDAR_FOOTER = b"END:VCALENDAR\r\n"
 
 
-def fetch_treasury_data() -> list[dict[str, Any]]:
-    """Fetch announced Treasury securities from TreasuryDirect API."""
+def load_cache() -> tuple[dict[str, Any], bytes] | None:
+    """Load the cached API response, or None if missing or inconsistent."""
+    try:
+        meta = json.loads(CACHE_META_FILE.read_text())
+        body = CACHE_BODY_FILE.read_bytes()
+    except (OSError, ValueError):
+        return None
+    if meta.get("body_sha") != hashlib.sha256(body).hexdigest():
+        return None
+    return meta, body
+
+
+def save_cache(etag: str | None, last_modified: str | None, body: bytes) -> None:
+    """Persist the API response body and its validators for conditional GETs."""
+    meta = {
+        "etag": etag,
+        "last_modified": last_modified,
+        "body_sha": hashlib.sha256(body).hexdigest(),
+        "fetched_at": time.time(),
+    }
+    try:
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        CACHE_BODY_FILE.write_bytes(body)
+        CACHE_META_FILE.write_text(json.dumps(meta))
+    except OSError as e:
+        logging.warning(f"Error saving Treasury data cache: {e}")
+
+
+def conditional_headers(meta: dict[str, Any]) -> dict[str, str]:
+    """Build If-None-Match/If-Modified-Since headers from cached validators."""
+    headers = {}
+    if etag := meta.get("etag"):
+        headers["If-None-Match"] = etag
+    if last_modified := meta.get("last_modified"):
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def fetch_treasury_data(max_age: int = DEFAULT_MAX_AGE) -> list[dict[str, Any]]:
+    """Fetch announced Treasury securities from TreasuryDirect API.
+
+    Responses are cached in OUTPUT_DIR. A cache younger than max_age seconds
+    is used without contacting the API; otherwise a conditional GET is sent
+    and the cached body is reused when the server answers 304 Not Modified.
+    """
+    cache = load_cache()
     try:
-        response = requests.get(API_URL, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        if cache is not None:
+            meta, body = cache
+            if time.time() - meta["fetched_at"] < max_age:
+                logging.info("Using cached Treasury data")
+                return json_loads(body)
+            headers = conditional_headers(meta)
+        else:
+            headers = {}
+
+        response = HTTP_POOL.request("GET", API_URL, headers=headers)
+        if cache is not None and response.status == 304:
+            logging.info("Treasury data not modified since last fetch")
+            save_cache(meta.get("etag"), meta.get("last_modified"), body)
+            return json_loads(body)
+
+        if response.status >= 400:
+            raise urllib3.exceptions.HTTPError(
+                f"{response.status} error for url: {API_URL}"
+            )
+        securities = json_loads(response.data)
+        save_cache(
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            response.data,
+        )
+        return securities
+    except (urllib3.exceptions.HTTPError, ValueError) as e:
         logging.error(f"Error fetching Treasury data: {e}")
         sys.exit(1)
 
 
-def parse_date(date_str: str) -> datetime:
-    """Parse ISO date string to datetime object."""
-    return datetime.fromisoformat(date_str.replace("T00:00:00", ""))
-
-
 def filter_securities(
     securities: list[dict[str, Any]], days_back: int
 ) -> list[dict[str, Any]]:
     """Filter out securities with auction dates earlier than days_back from now."""
-    cutoff_date = (datetime.now() - timedelta(days=days_back)).date()
-    filtered = []
-    for security in securities:
-        auction_date = parse_date(security["auctionDate"]).date()
-        if auction_date >= cutoff_date:
-            filtered.append(security)
-    return filtered
+    # ISO-8601 dates sort lexicographically, so compare the date prefix as-is.
+    cutoff_str = (datetime.now() - timedelta(days=days_back)).strftime("%Y-%m-%d")
+    return [s for s in securities if s["auctionDate"][:10] >= cutoff_str]
 
 
-def create_announcement_event(security: dict[str, Any]) -> Event:
-    """Create calendar event for auction announcement."""
-    event = Event()
+def deduplicate_securities(
+    securities: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """Drop repeated rows for the same CUSIP and auction date, keeping the last."""
+    return list({f"{s['cusip']}-{s['auctionDate']}": s for s in securities}.values())
+
+
+def escape_text(value: str) -> str:
+    """Escape an iCalendar TEXT value (RFC 5545, section 3.3.11)."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line: str, limit: int = 75) -> str:
+    """Fold a content line so no physical line exceeds limit octets."""
+    if line.isascii():
+        step = limit - 1
+        return "\r\n ".join(line[i:i + step] for i in range(0, len(line), step))
+
+    folded = []
+    octets = 0
+    for char in line:
+        size = len(char.encode())
+        octets += size
+        if octets >= limit:
+            folded.append("\r\n ")
+            octets = size
+        folded.append(char)
+    return "".join(folded)
+
+
+def format_ical_date(date_str: str) -> str:
+    """Convert an ISO date string (YYYY-MM-DD...) to iCalendar DATE form."""
+    return date_str[:4] + date_str[5:7] + date_str[8:10]
+
+
+def format_vevent(
+    uid: str,
+    dtstart: str,
+    summary: str,
+    description: str,
+    categories: Iterable[str],
+) -> bytes:
+    """Serialize a VEVENT block as CRLF-terminated, folded content lines.
+
+    dtstart is an iCalendar DATE value (YYYYMMDD), see format_ical_date.
+    """
+    # Same property order as icalendar used, so the committed file does not churn.
+    lines = [
+        "BEGIN:VEVENT",
+        f"SUMMARY:{escape_text(summary)}",
+        f"DTSTART;VALUE=DATE:{dtstart}",
+        f"UID:{escape_text(uid)}",
+        "CATEGORIES:" + ",".join(escape_text(c) for c in categories),
+        f"DESCRIPTION:{escape_text(description)}",
+        "END:VEVENT",
+    ]
+    return "".join(fold_line(line) + "\r\n" for line in lines).encode()
+
 
-    announcement_date = parse_date(security["announcementDate"])
-    event.add("uid", f"{security['cusip']}-announcement@treasurydirect.gov")
+@lru_cache(maxsize=None)
+def event_summary(term: str, security_type: str, suffix: str = "") -> str:
+    """Return the event summary, shared by all securities of a term and type."""
+    return f"{term} {security_type} Auction{suffix}"
+
+
+@lru_cache(maxsize=None)
+def event_categories(kind: str, security_type: str) -> tuple[str, str, str]:
+    """Return the event categories, shared by all securities of a type."""
+    return ("Treasury", kind, security_type)
+
+
+def create_announcement_event(security: dict[str, Any]) -> bytes:
+    """Create calendar event for auction announcement."""
     # Do not emit DTSTAMP. It is regenerated on every run, causing the .ics
     # file to change even when Treasury auction data has not changed.
-    # event.add("dtstamp", datetime.now(UTC))
-    event.add("dtstart", announcement_date.date())
 
-    summary = f"{security['securityTerm']} {security['securityType']} Auction Announced"
-    event.add("summary", summary)
+    summary = event_summary(
+        security["securityTerm"], security["securityType"], " Announced"
+    )
 
     description_parts = [
         f"Auction Date: {security['auctionDate']}",
@@ -76,81 +233,91 @@ def create_announcement_event(security: dict[str, Any]) -> Event:
     if maturity_date := security.get("maturityDate"):
         description_parts.append(f"Maturity Date: {maturity_date[:10]}")
 
-    event.add("description", "\n".join(description_parts))
-
-    event.add("categories", ["Treasury", "Announcement", security["securityType"]])
-
-    return event
+    return format_vevent(
+        uid=f"{security['cusip']}-announcement@treasurydirect.gov",
+        dtstart=format_ical_date(security["announcementDate"]),
+        summary=summary,
+        description="\n".join(description_parts),
+        categories=event_categories("Announcement", security["securityType"]),
+    )
 
 
-def create_auction_event(security: dict[str, Any]) -> Event:
+def create_auction_event(security: dict[str, Any]) -> bytes:
     """Create calendar event for the auction itself."""
-    event = Event()
-
-    auction_date = parse_date(security["auctionDate"])
-    announcement_date = parse_date(security["announcementDate"])
-    event.add("uid", f"{security['cusip']}-auction@treasurydirect.gov")
     # Do not emit DTSTAMP. It is regenerated on every run, causing the .ics
     # file to change even when Treasury auction data has not changed.
-    # event.add("dtstamp", datetime.now(UTC))
-    event.add("dtstart", auction_date.date())
 
-    summary = f"{security['securityTerm']} {security['securityType']} Auction"
-    event.add("summary", summary)
+    summary = event_summary(security["securityTerm"], security["securityType"])
 
+    competitive = security.get("closingTimeCompetitive")
+    noncompetitive = security.get("closingTimeNoncompetitive")
+    issue_date = security.get("issueDate")
+    maturity_date = security.get("maturityDate")
+    # Fixed-size list; missing optional fields are None and skipped on join.
     description_parts = [
         f"CUSIP: {security['cusip']}",
         f"Security Term: {security['securityTerm']}",
         f"Offering Amount: ${security.get('offeringAmount', 'TBD')}",
+        f"Competitive Closing: {competitive}" if competitive else None,
+        f"Non-Competitive Closing: {noncompetitive}" if noncompetitive else None,
+        f"Issue Date: {issue_date}" if issue_date else None,
+        f"Maturity Date: {maturity_date}" if maturity_date else None,
     ]
 
-    if closing_time := security.get("closingTimeCompetitive"):
-        description_parts.append(f"Competitive Closing: {closing_time}")
-    if closing_time := security.get("closingTimeNoncompetitive"):
-        description_parts.append(f"Non-Competitive Closing: {closing_time}")
-    if issue_date := security.get("issueDate"):
-        description_parts.append(f"Issue Date: {issue_date}")
-    if maturity_date := security.get("maturityDate"):
-        description_parts.append(f"Maturity Date: {maturity_date}")
-
-    event.add("description", "\n".join(description_parts))
-    event.add("categories", ["Treasury", "Auction", security["securityType"]])
-
-    return event
-
+    return format_vevent(
+        uid=f"{security['cusip']}-auction@treasurydirect.gov",
+        dtstart=format_ical_date(security["auctionDate"]),
+        summary=summary,
+        description="\n".join(part for part in description_parts if part),
+        categories=event_categories("Auction", security["securityType"]),
+    )
 
-def generate_calendar(securities: list[dict[str, Any]], event_types: list[str]) -> Calendar:
-    """Generate iCalendar object from Treasury securities data."""
-    calendar = Calendar()
-    calendar.add("prodid", "-//Treasury Auction Calendar//elmotec.github.io//")
-    calendar.add("version", "2.0")
 
+def iter_vevent_bytes(
+    securities: list[dict[str, Any]], event_types: list[str]
+) -> Iterator[bytes]:
+    """Yield serialized VEVENT blocks for Treasury securities data."""
     for security in securities:
         if "announcement" in event_types:
-            calendar.add_component(create_announcement_event(security))
+            yield create_announcement_event(security)
         if "auction" in event_types:
-            calendar.add_component(create_auction_event(security))
-
-    return calendar
+            yield create_auction_event(security)
 
 
-def save_calendar(calendar: Calendar) -> None:
-    """Save calendar to .ics file."""
+def save_calendar(events: Iterable[bytes]) -> str:
+    """Stream calendar events to .ics file and return its content hash."""
+    digest = hashlib.blake2b(digest_size=16)
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    OUTPUT_FILE.write_bytes(calendar.to_ical())
+    # Write to a temporary file and rename it over OUTPUT_FILE so readers
+    # never see a partially written calendar.
+    tmp_file = OUTPUT_FILE.with_suffix(".ics.tmp")
+    try:
+        with tmp_file.open("wb", buffering=WRITE_BUFFER_SIZE) as f:
+            for chunk in chain([VCALENDAR_HEADER], events, [VCALENDAR_FOOTER]):
+                digest.update(chunk)
+                f.write(chunk)
+        os.replace(tmp_file, OUTPUT_FILE)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
     logging.info(f"Calendar saved to {OUTPUT_FILE}")
+    return digest.hexdigest()
 
 
 def run_git_command(command: list[str]) -> subprocess.CompletedProcess:
-    """Execute git command and return result."""
+    """Execute git command and return result with undecoded output."""
     return subprocess.run(
         command,
         capture_output=True,
-        text=True,
         check=False,
     )
 
 
+def decode_output(output: bytes) -> str:
+    """Decode captured git output, only when it is actually inspected."""
+    return output.decode("utf-8", "replace")
+
+
 def has_changes_to_commit(output: str) -> bool:
     """Check if there are changes to commit."""
     for line in output.splitlines():
@@ -162,37 +329,53 @@ def has_changes_to_commit(output: str) -> bool:
     return False
 
 
-def commit_and_push() -> None:
-    """Commit calendar file to git and push to remote."""
+def commit_and_push(digest: str) -> None:
+    """Commit calendar file to git and push to remote.
+
+    digest is the content hash returned by save_calendar. It is recorded in
+    HASH_FILE once the calendar is known to be committed, so later runs that
+    produce the same calendar can skip git entirely.
+    """
+    try:
+        if HASH_FILE.read_text() == digest:
+            logging.info("No changes to commit")
+            return
+    except OSError:
+        pass
+
     result = run_git_command(["git", "add", str(OUTPUT_FILE)])
     if result.returncode != 0:
-        logging.error(f"Error staging changes: {result.stderr}")
+        logging.error(f"Error staging changes: {decode_output(result.stderr)}")
         sys.exit(1)
 
     result = run_git_command(["git", "diff", "--cached", str(OUTPUT_FILE)])
 
-    if not has_changes_to_commit(result.stdout):
+    if not has_changes_to_commit(decode_output(result.stdout)):
         logging.info("No changes to commit")
+        HASH_FILE.write_text(digest)
         return
 
     result = run_git_command([
         "git", "commit", "-m", "chore: update Treasury auction calendar"
     ])
     if result.returncode != 0:
-        logging.error(f"Error committing changes: {result.stderr}")
+        logging.error(f"Error committing changes: {decode_output(result.stderr)}")
         sys.exit(1)
 
     logging.info("Changes committed")
 
     result = run_git_command(["git", "push", "origin", "main"])
     if result.returncode != 0:
-        logging.error(f"Error pushing changes: {result.stderr}")
+        logging.error(f"Error pushing changes: {decode_output(result.stderr)}")
         sys.exit(1)
 
     logging.info("Changes pushed to remote")
+    HASH_FILE.write_text(digest)
 
 
-def main(commit: bool, days_back: int, event_types: list[str]) -> None:
+def main(
+    commit: bool, days_back: int, event_types: list[str], max_age: int
+) -> None:
     """Main execution flow."""
     logging.basicConfig(
         level=logging.INFO,
@@ -200,21 +383,20 @@ def main(commit: bool, days_back: int, event_types: list[str]) -> None:
     )
 
     logging.info("Fetching Treasury auction data...")
-    securities = fetch_treasury_data()
+    securities = fetch_treasury_data(max_age)
     logging.info(f"Found {len(securities)} announced securities")
 
     logging.info(f"Filtering securities with auction dates in last {days_back} days...")
     securities = filter_securities(securities, days_back)
+    securities = deduplicate_securities(securities)
     logging.info(f"After filtering: {len(securities)} securities")
 
     logging.info("Generating calendar...")
-    calendar = generate_calendar(securities, event_types)
-
-    save_calendar(calendar)
+    digest = save_calendar(iter_vevent_bytes(securities, event_types))
 
     if commit:
         logging.info("Committing and pushing changes...")
-        commit_and_push()
+        commit_and_push(digest)
     else:
         logging.info("Skipping commit (use --commit to enable)")
 
@@ -243,9 +425,20 @@ def main(commit: bool, days_back: int, event_types: list[str]) -> None:
     multiple=True,
     help="Type of events to include in calendar (default: auction)",
 )
-def cli(commit: bool, days_back: int, event_types: list[str]) -> None:
+@click.option(
+    "--max-age",
+    type=int,
+    default=DEFAULT_MAX_AGE,
+    help=(
+        "Reuse cached Treasury data fetched within the last N seconds "
+        f"(default: {DEFAULT_MAX_AGE})"
+    ),
+)
+def cli(
+    commit: bool, days_back: int, event_types: list[str], max_age: int
+) -> None:
     """Download Treasury auction data and generate iCalendar file."""    
-    main(commit, days_back, event_types)
+    main(commit, days_back, event_types, max_age)
 
 
 if __name__ == "__main__":